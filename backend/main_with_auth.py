@@ -9,6 +9,7 @@ from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from typing import Optional
+import asyncio
 import uvicorn
 
 from models.schemas_updated import (
@@ -20,7 +21,7 @@ from models.schemas_updated import (
 )
 from services.database import supabase_service
 from services.auth import auth_service
-from core.minimax import MinimaxEngine
+from core.minimax import shared_engine
 
 # ===========================
 # APP INITIALIZATION
@@ -44,7 +45,7 @@ app.add_middleware(
 )
 
 # Initialize AI engine
-ai_engine = MinimaxEngine()
+ai_engine = shared_engine
 
 
 # ===========================
@@ -405,20 +406,20 @@ async def get_ai_move(move_request: AIMoveRequest):
     FIXED: Added board sanitization to ensure empty strings are treated as None.
     """
     try:
-        # 1. SANITIZE BOARD: Ensure ["X", "", ""] becomes ["X", None, None]
-        # This prevents the AI from thinking the board is full.
-        clean_board = [None if cell == "" or cell is None else cell for cell in move_request.board]
-        
-        # 2. GET DIFFICULTY: Ensure it's a string and lowercase
+        # The board arrives sanitized: AIMoveRequest.validate_board maps
+        # "" to None, so ["X", "", ""] is already ["X", None, None] here.
         diff_str = move_request.difficulty.value.lower() if hasattr(move_request.difficulty, 'value') else str(move_request.difficulty).lower()
 
-        # 3. CALL ENGINE
-        result = ai_engine.get_best_move(
-            board=clean_board,
+        # Run the engine on a worker thread so the CPU-bound search
+        # doesn't block the event loop under concurrent requests.
+        result = await asyncio.to_thread(
+            ai_engine.get_best_move,
+            board=move_request.board,
             player=move_request.player,
-            difficulty=diff_str
+            difficulty=diff_str,
+            explain=True
         )
-        
+
         if result is None or result.get('move') is None:
             raise HTTPException(status_code=400, detail="No valid moves available")
         
@@ -438,12 +439,12 @@ async def get_ai_move(move_request: AIMoveRequest):
 async def evaluate_position(move_request: AIMoveRequest):
     """Detailed position analysis."""
     try:
-        clean_board = [None if cell == "" or cell is None else cell for cell in move_request.board]
-        
-        result = ai_engine.get_best_move(
-            board=clean_board,
+        result = await asyncio.to_thread(
+            ai_engine.get_best_move,
+            board=move_request.board,
             player=move_request.player,
-            difficulty='hard'
+            difficulty='hard',
+            explain=True
         )
         
         return {
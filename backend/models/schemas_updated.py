@@ -32,6 +32,11 @@ class MatchResult(str, Enum):
     DRAW = "draw"
 
 
+# Valid cell values, hoisted so the hot-path board validators do a single
+# frozenset membership test per cell instead of a list scan
+_VALID_CELLS = frozenset((None, 'X', 'O'))
+
+
 # ===========================
 # AUTHENTICATION MODELS
 # ===========================
@@ -161,6 +166,13 @@ class RoundCreate(BaseModel):
     player1_score: int
     player2_score: int
 
+    @validator('board_state')
+    def validate_board_state(cls, v):
+        v = [None if cell == '' else cell for cell in v]
+        if any(cell not in _VALID_CELLS for cell in v):
+            raise ValueError('Board cells must be None, X, or O')
+        return v
+
 
 class MatchComplete(BaseModel):
     """Model for completing a match"""
@@ -177,14 +189,23 @@ class AIMoveRequest(BaseModel):
     """Request for AI move"""
     board: List[Optional[str]] = Field(..., min_length=9, max_length=9)
     difficulty: Difficulty
-    player: str = Field(..., pattern='^[XO]$')
-    
+    player: str
+
+    @validator('player')
+    def validate_player(cls, v):
+        # Membership check instead of the regex pattern='^[XO]$' — no
+        # regex engine on a two-letter alphabet
+        if v not in ('X', 'O'):
+            raise ValueError('Player must be X or O')
+        return v
+
     @validator('board')
     def validate_board(cls, v):
-        # Check valid values
-        for cell in v:
-            if cell not in [None, 'X', 'O']:
-                raise ValueError('Board cells must be None, X, or O')
+        # Normalize empty strings to None here so the endpoints and the
+        # engine can rely on a clean board without re-sanitizing
+        v = [None if cell == '' else cell for cell in v]
+        if any(cell not in _VALID_CELLS for cell in v):
+            raise ValueError('Board cells must be None, X, or O')
         return v
 
 
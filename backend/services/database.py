@@ -5,11 +5,18 @@ All database operations
 ============================================
 """
 
-import os
-from supabase import create_client, Client
+import functools
+from supabase import Client
 from typing import Optional, List, Dict
-from datetime import datetime
-import uuid
+from datetime import datetime, timezone
+
+from services.ids import uuid7
+from services.supabase_client import execute_async, get_supabase_client
+
+
+# Display labels for final_result values; one hash lookup per row instead
+# of chained comparisons
+_RESULT_MAP = {'player1_win': 'Win', 'player2_win': 'Loss'}
 
 
 class SupabaseService:
@@ -24,14 +31,8 @@ class SupabaseService:
     """
     
     def __init__(self):
-        """Initialize Supabase client"""
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
-        
-        self.client: Client = create_client(supabase_url, supabase_key)
+        """Initialize with the shared Supabase client"""
+        self.client: Client = get_supabase_client()
     
     # ===========================
     # USER OPERATIONS
@@ -49,25 +50,25 @@ class SupabaseService:
         """
         try:
             # Check if user exists
-            response = self.client.table('users').select('*').eq('username', username).execute()
+            response = await execute_async(self.client.table('users').select('*').eq('username', username).limit(1).maybe_single())
             
-            if response.data and len(response.data) > 0:
+            if response is not None:
                 # User exists, return their data
-                return response.data[0]
+                return response.data
             
             # Create new user
-            user_id = str(uuid.uuid4())
+            user_id = str(uuid7())
             new_user = {
                 'id': user_id,
                 'username': username,
-                'created_at': datetime.utcnow().isoformat(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
                 'total_matches': 0,
                 'matches_won': 0,
                 'matches_lost': 0,
                 'matches_drawn': 0
             }
             
-            response = self.client.table('users').insert(new_user).execute()
+            response = await execute_async(self.client.table('users').insert(new_user))
             return response.data[0]
             
         except Exception as e:
@@ -76,8 +77,8 @@ class SupabaseService:
     async def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
         try:
-            response = self.client.table('users').select('*').eq('id', user_id).execute()
-            return response.data[0] if response.data else None
+            response = await execute_async(self.client.table('users').select('*').eq('id', user_id).limit(1).maybe_single())
+            return response.data if response else None
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
@@ -90,20 +91,14 @@ class SupabaseService:
     ):
         """Update user statistics after match completion"""
         try:
-            # Get current stats
-            user = await self.get_user_by_id(user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            # Update stats
-            new_stats = {
-                'total_matches': user['total_matches'] + 1,
-                'matches_won': user['matches_won'] + matches_won,
-                'matches_lost': user['matches_lost'] + matches_lost,
-                'matches_drawn': user['matches_drawn'] + matches_drawn
-            }
-            
-            self.client.table('users').update(new_stats).eq('id', user_id).execute()
+            # One atomic increment on the server: no pre-read, and no
+            # lost-update race between concurrent match completions
+            await execute_async(self.client.rpc('increment_user_stats', {
+                'user_uuid': user_id,
+                'won': matches_won,
+                'lost': matches_lost,
+                'drawn': matches_drawn
+            }))
             
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
@@ -130,7 +125,7 @@ class SupabaseService:
             Match dictionary with match_id and initial state
         """
         try:
-            match_id = str(uuid.uuid4())
+            match_id = str(uuid7())
             match_data = {
                 'id': match_id,
                 'user_id': user_id,
@@ -140,12 +135,12 @@ class SupabaseService:
                 'current_round': 1,
                 'player1_score': 0,
                 'player2_score': 0,
-                'created_at': datetime.utcnow().isoformat(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
                 'completed_at': None,
                 'final_result': None
             }
             
-            response = self.client.table('matches').insert(match_data).execute()
+            response = await execute_async(self.client.table('matches').insert(match_data))
             return response.data[0]
             
         except Exception as e:
@@ -154,15 +149,15 @@ class SupabaseService:
     async def get_match(self, match_id: str) -> Optional[Dict]:
         """Get match by ID"""
         try:
-            response = self.client.table('matches').select('*').eq('id', match_id).execute()
-            return response.data[0] if response.data else None
+            response = await execute_async(self.client.table('matches').select('*').eq('id', match_id).limit(1).maybe_single())
+            return response.data if response else None
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
     async def update_match(self, match_id: str, updates: Dict):
         """Update match data"""
         try:
-            self.client.table('matches').update(updates).eq('id', match_id).execute()
+            await execute_async(self.client.table('matches').update(updates).eq('id', match_id))
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
@@ -183,28 +178,15 @@ class SupabaseService:
             final_score_p2: Final score for player 2
         """
         try:
-            # Get match data
-            match = await self.get_match(match_id)
-            if not match:
-                raise ValueError("Match not found")
-            
-            # Update match
-            updates = {
-                'status': 'completed',
-                'completed_at': datetime.utcnow().isoformat(),
-                'final_result': result,
-                'player1_score': final_score_p1,
-                'player2_score': final_score_p2
-            }
-            await self.update_match(match_id, updates)
-            
-            # Update user stats
-            if result == 'player1_win':
-                await self.update_user_stats(match['user_id'], matches_won=1)
-            elif result == 'player2_win':
-                await self.update_user_stats(match['user_id'], matches_lost=1)
-            else:
-                await self.update_user_stats(match['user_id'], matches_drawn=1)
+            # One server-side transaction updates the match and the
+            # owner's stats together, instead of read-update-update across
+            # several round trips
+            await execute_async(self.client.rpc('complete_match_tx', {
+                'match_uuid': match_id,
+                'match_result': result,
+                'score_p1': final_score_p1,
+                'score_p2': final_score_p2
+            }))
                 
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
@@ -235,24 +217,19 @@ class SupabaseService:
         """
         try:
             round_data = {
-                'id': str(uuid.uuid4()),
+                'id': str(uuid7()),
                 'match_id': match_id,
                 'round_number': round_number,
                 'winner': winner,
                 'board_state': board_state,
                 'player1_score': player1_score,
                 'player2_score': player2_score,
-                'created_at': datetime.utcnow().isoformat()
+                'created_at': datetime.now(timezone.utc).isoformat()
             }
             
-            self.client.table('rounds').insert(round_data).execute()
-            
-            # Update match's current round
-            await self.update_match(match_id, {
-                'current_round': round_number,
-                'player1_score': player1_score,
-                'player2_score': player2_score
-            })
+            # The sync_match_on_round_insert trigger carries the round
+            # number and scores onto the match row, so one INSERT does it
+            await execute_async(self.client.table('rounds').insert(round_data))
             
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
@@ -260,7 +237,7 @@ class SupabaseService:
     async def get_match_rounds(self, match_id: str) -> List[Dict]:
         """Get all rounds for a match"""
         try:
-            response = self.client.table('rounds').select('*').eq('match_id', match_id).order('round_number').execute()
+            response = await execute_async(self.client.table('rounds').select('*').eq('match_id', match_id).order('round_number'))
             return response.data
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
@@ -281,61 +258,46 @@ class SupabaseService:
             - Match history
         """
         try:
-            # Get user data
-            user = await self.get_user_by_id(user_id)
-            if not user:
-                raise ValueError("User not found")
+            # One RPC returns the user row, the SQL-computed win rate, and
+            # the 50 latest completed matches as a single JSON payload
+            response = await execute_async(self.client.rpc('get_user_statistics', {'user_uuid': user_id}))
             
-            # Calculate win rate
-            total = user['total_matches']
-            win_rate = (user['matches_won'] / total * 100) if total > 0 else 0
-            
-            # Get match history
-            response = self.client.table('matches')\
-                .select('*')\
-                .eq('user_id', user_id)\
-                .eq('status', 'completed')\
-                .order('completed_at', desc=True)\
-                .limit(50)\
-                .execute()
+            data = response.data
+            if not data:
+                raise ValueError("User not found")
             
-            matches = response.data
+            user = data['user']
             
-            # Format match history
+            # Light display formatting only; the aggregation happened in SQL
             match_history = []
-            for match in matches:
-                opponent = self._get_opponent_name(match)
-                result = self._format_result(match['final_result'])
-                score = f"{match['player1_score']}-{match['player2_score']}"
-                
+            for match in data['history']:
                 match_history.append({
                     'date': match['completed_at'],
-                    'opponent': opponent,
+                    'opponent': self._get_opponent_name(match['mode'], match.get('difficulty')),
                     'mode': match['mode'],
                     'difficulty': match.get('difficulty'),
-                    'result': result,
-                    'score': score
+                    'result': self._format_result(match['final_result']),
+                    'score': f"{match['player1_score']}-{match['player2_score']}"
                 })
             
             return {
                 'user_id': user_id,
                 'username': user['username'],
-                'total_matches': total,
+                'total_matches': user['total_matches'],
                 'matches_won': user['matches_won'],
                 'matches_lost': user['matches_lost'],
                 'matches_drawn': user['matches_drawn'],
-                'win_rate': round(win_rate, 1),
+                'win_rate': float(data['win_rate']),
                 'match_history': match_history
             }
             
         except Exception as e:
             raise Exception(f"Database error: {str(e)}")
     
-    def _get_opponent_name(self, match: Dict) -> str:
-        """Get opponent name based on mode"""
-        mode = match['mode']
-        difficulty = match.get('difficulty')
-        
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_opponent_name(mode: str, difficulty: Optional[str]) -> str:
+        """Get opponent name based on mode (cached: few distinct inputs)"""
         if mode == 'human_vs_ai':
             return f"AI ({difficulty})" if difficulty else "AI"
         elif mode == 'human_vs_human':
@@ -345,12 +307,7 @@ class SupabaseService:
     
     def _format_result(self, result: str) -> str:
         """Format result for display"""
-        if result == 'player1_win':
-            return 'Win'
-        elif result == 'player2_win':
-            return 'Loss'
-        else:
-            return 'Draw'
+        return _RESULT_MAP.get(result, 'Draw')
 
 
 # Singleton instance
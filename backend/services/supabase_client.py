@@ -0,0 +1,55 @@
+"""
+============================================
+SHARED SUPABASE CLIENT
+One client (and one connection pool) per process
+============================================
+"""
+
+import asyncio
+import os
+from typing import Optional
+from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+
+_client: Optional[Client] = None
+
+
+def get_supabase_client() -> Client:
+    """
+    Return the process-wide Supabase client, creating it on first use.
+
+    Auth and database services previously each built their own client,
+    doubling the underlying HTTP connection pools and TLS handshakes.
+    Sharing one client keeps connections warm across all service calls.
+    """
+    global _client
+    if _client is None:
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
+
+        # Explicit timeouts so a stalled Supabase call fails fast instead
+        # of holding a worker for httpx's much longer default. The pinned
+        # supabase 2.0.3 doesn't accept a custom httpx client, so pool
+        # sizes and HTTP/2 aren't tunable here — sharing this one client
+        # is what keeps connections warm across services.
+        options = ClientOptions(
+            postgrest_client_timeout=10,
+            storage_client_timeout=10,
+        )
+        _client = create_client(supabase_url, supabase_key, options=options)
+    return _client
+
+
+async def execute_async(query):
+    """
+    Execute a blocking PostgREST query on a worker thread.
+
+    The pinned supabase 2.0.3 has no async client, so execute() performs
+    synchronous HTTP. Running it via asyncio.to_thread keeps the event
+    loop free and lets concurrent requests overlap their network latency.
+    """
+    return await asyncio.to_thread(query.execute)
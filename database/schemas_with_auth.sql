@@ -17,12 +17,9 @@ CREATE TABLE users (
     email VARCHAR(255) UNIQUE NOT NULL,
     
     -- Authentication fields
-    password_hash VARCHAR(128) NOT NULL,
+    password_hash VARCHAR(160) NOT NULL,  -- 'pbkdf2_sha512$210000$' prefix + 128 hex chars
     password_salt VARCHAR(32) NOT NULL,
-    
-    -- Password reset fields
-    reset_token VARCHAR(64),
-    reset_token_expires TIMESTAMP WITH TIME ZONE,
+
     
     -- Timestamps
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
@@ -50,7 +47,6 @@ CREATE TABLE users (
 -- Indexes for fast lookups
 CREATE INDEX idx_users_username ON users(username);
 CREATE INDEX idx_users_email ON users(email);
-CREATE INDEX idx_users_reset_token ON users(reset_token) WHERE reset_token IS NOT NULL;
 
 -- ============================================
 -- MATCHES TABLE
@@ -95,7 +91,10 @@ CREATE TABLE matches (
 CREATE INDEX idx_matches_user_id ON matches(user_id);
 CREATE INDEX idx_matches_status ON matches(status);
 CREATE INDEX idx_matches_created_at ON matches(created_at DESC);
-CREATE INDEX idx_matches_user_completed ON matches(user_id, completed_at DESC) 
+-- Covers the history query in get_user_statistics: the INCLUDE columns
+-- let it run index-only, with no heap fetch per match row
+CREATE INDEX idx_matches_user_completed ON matches(user_id, completed_at DESC)
+    INCLUDE (mode, difficulty, final_result, player1_score, player2_score)
     WHERE status = 'completed';
 
 -- ============================================
@@ -161,6 +160,25 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Keep the parent match's progress in sync when a round is saved, so the
+-- application only pays one INSERT per round
+CREATE OR REPLACE FUNCTION sync_match_from_round()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE matches
+    SET current_round = NEW.round_number,
+        player1_score = NEW.player1_score,
+        player2_score = NEW.player2_score
+    WHERE id = NEW.match_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER sync_match_on_round_insert
+    AFTER INSERT ON rounds
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_match_from_round();
+
 -- ============================================
 -- FUNCTIONS
 -- Helper functions for statistics and auth
@@ -186,20 +204,100 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Clean expired reset tokens (run periodically)
-CREATE OR REPLACE FUNCTION clean_expired_reset_tokens()
-RETURNS INTEGER AS $$
+-- Atomically bump a user's match counters (one UPDATE, no read-modify-write)
+CREATE OR REPLACE FUNCTION increment_user_stats(
+    user_uuid UUID,
+    won INTEGER DEFAULT 0,
+    lost INTEGER DEFAULT 0,
+    drawn INTEGER DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE users
+    SET total_matches = total_matches + 1,
+        matches_won = matches_won + won,
+        matches_lost = matches_lost + lost,
+        matches_drawn = matches_drawn + drawn,
+        updated_at = NOW()
+    WHERE id = user_uuid;
+    
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'User not found: %', user_uuid;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Complete a match and bump the owner's stats in one transaction
+CREATE OR REPLACE FUNCTION complete_match_tx(
+    match_uuid UUID,
+    match_result VARCHAR(20),
+    score_p1 INTEGER,
+    score_p2 INTEGER
+)
+RETURNS VOID AS $$
 DECLARE
-    rows_updated INTEGER;
+    owner_id UUID;
 BEGIN
-    UPDATE users 
-    SET reset_token = NULL, 
-        reset_token_expires = NULL
-    WHERE reset_token IS NOT NULL 
-      AND reset_token_expires < NOW();
+    UPDATE matches
+    SET status = 'completed',
+        completed_at = NOW(),
+        final_result = match_result,
+        player1_score = score_p1,
+        player2_score = score_p2
+    WHERE id = match_uuid
+    RETURNING user_id INTO owner_id;
     
-    GET DIAGNOSTICS rows_updated = ROW_COUNT;
-    RETURN rows_updated;
+    IF owner_id IS NULL THEN
+        RAISE EXCEPTION 'Match not found: %', match_uuid;
+    END IF;
+    
+    PERFORM increment_user_stats(
+        owner_id,
+        CASE WHEN match_result = 'player1_win' THEN 1 ELSE 0 END,
+        CASE WHEN match_result = 'player2_win' THEN 1 ELSE 0 END,
+        CASE WHEN match_result NOT IN ('player1_win', 'player2_win') THEN 1 ELSE 0 END
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- User profile, win rate, and recent history in one round trip
+CREATE OR REPLACE FUNCTION get_user_statistics(user_uuid UUID)
+RETURNS JSONB AS $$
+DECLARE
+    result JSONB;
+BEGIN
+    SELECT jsonb_build_object(
+        'user', jsonb_build_object(
+            'id', u.id,
+            'username', u.username,
+            'total_matches', u.total_matches,
+            'matches_won', u.matches_won,
+            'matches_lost', u.matches_lost,
+            'matches_drawn', u.matches_drawn
+        ),
+        'win_rate', calculate_win_rate(user_uuid),
+        'history', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'completed_at', m.completed_at,
+                'mode', m.mode,
+                'difficulty', m.difficulty,
+                'final_result', m.final_result,
+                'player1_score', m.player1_score,
+                'player2_score', m.player2_score
+            ) ORDER BY m.completed_at DESC)
+            FROM (
+                SELECT * FROM matches
+                WHERE user_id = user_uuid AND status = 'completed'
+                ORDER BY completed_at DESC
+                LIMIT 50
+            ) m
+        ), '[]'::jsonb)
+    )
+    INTO result
+    FROM users u
+    WHERE u.id = user_uuid;
+    
+    RETURN result;  -- NULL when the user does not exist
 END;
 $$ LANGUAGE plpgsql;
 
@@ -264,13 +362,6 @@ ORDER BY last_login DESC;
 -- Setup in Supabase Dashboard → Database → Cron
 -- ============================================
 
--- Clean expired reset tokens every hour
--- SELECT cron.schedule(
---     'clean-expired-tokens',
---     '0 * * * *',  -- Every hour
---     $$ SELECT clean_expired_reset_tokens(); $$
--- );
-
 -- ============================================
 -- SAMPLE DATA (for testing)
 -- ============================================
@@ -374,7 +465,6 @@ COMMENT ON TABLE rounds IS 'Stores individual round data within matches';
 
 COMMENT ON COLUMN users.password_hash IS 'PBKDF2-SHA256 hash of user password';
 COMMENT ON COLUMN users.password_salt IS 'Random salt for password hashing';
-COMMENT ON COLUMN users.reset_token IS 'Token for password reset (expires in 1 hour)';
 COMMENT ON COLUMN matches.mode IS 'Game mode: human_vs_ai, human_vs_human, or ai_vs_ai';
 COMMENT ON COLUMN matches.difficulty IS 'AI difficulty: easy, medium, or hard (only for human_vs_ai)';
 COMMENT ON COLUMN rounds.board_state IS 'Final board state as JSON array of 9 elements';
\ No newline at end of file